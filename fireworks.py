@@ -5,12 +5,12 @@ Test:
 8 4
 10 2
 
+Run with --stream for large inputs: stdin is read in big chunks, the fireworks are not stored and not echoed back.
 """
 
-parameters = input().split(" ")
-w = int(parameters[0])
-h = int(parameters[1])
-f = int(parameters[2])
+import sys
+
+STREAM_CHUNK = 1 << 20
 
 """
 5.....#
@@ -26,6 +26,53 @@ def getFullFillHeight(x, y):
     return y + min(x, w - x - 1) - w + 1
 
 
+def readInts(stream, chunkSize=STREAM_CHUNK):
+    # a number may be cut in half at the end of a chunk, carry it over to the next one
+    leftover = b""
+    while True:
+        chunk = stream.read(chunkSize)
+        if not chunk:
+            break
+        tokens = (leftover + chunk).split()
+        leftover = b""
+        if tokens and not chunk[-1:].isspace():
+            leftover = tokens.pop()
+        for token in tokens:
+            yield int(token)
+    if leftover:
+        yield int(leftover)
+
+
+if "--stream" in sys.argv:
+    numbers = readInts(sys.stdin.buffer)
+    w = next(numbers)
+    h = next(numbers)
+    f = next(numbers)
+
+    highestIndex = 0
+    highestWork = 0
+
+    fullFill = -1
+
+    for i in range(f):
+        x = next(numbers)
+        y = next(numbers)
+        if y > highestWork:
+            highestIndex = i
+            highestWork = y
+
+        newFill = getFullFillHeight(x, y)
+        if newFill > fullFill:
+            fullFill = newFill
+
+    print(f"highestWork: {highestWork} fullFill: {fullFill}")
+    sys.exit()
+
+parameters = input().split(" ")
+w = int(parameters[0])
+h = int(parameters[1])
+f = int(parameters[2])
+
 highestIndex = 0
 highestWork = 0
 
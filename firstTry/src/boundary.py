@@ -0,0 +1,72 @@
+from array import array
+
+from map import CELL_SIZE, cellToWorld
+
+
+class BoundarySchedule:
+    """
+    Precomputed closing schedule of the boundary.
+    The boundary closes in linearly from all four sides, so the time at which any point gets enclosed only depends on
+    its distance to the nearest edge of the map. Per cell times are stored column major (same as Map) in `times`.
+    """
+
+    def __init__(self, width: float, height: float, speed: float, times=None):
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.cellWidth = int(width // CELL_SIZE)
+        self.cellHeight = int(height // CELL_SIZE)
+
+        # the bounds are less than 150 apart once both sides have moved (height - 150) / 2
+        self.endgameTime = (height - 150) / (2 * speed)
+
+        if times is None:
+            times = array("d")
+            for x in range(self.cellWidth):
+                for y in range(self.cellHeight):
+                    times.append(self.enclosedTime(cellToWorld(x, y)))
+        self.times = times
+
+    def enclosedTime(self, coords: list[float], padding: float = 0) -> float:
+        """
+        Time after which coords (shrunk inwards by padding) are outside of the boundary.
+        """
+        edge = min(
+            coords[0], coords[1], self.width - coords[0], self.height - coords[1]
+        )
+        return (edge - padding) / self.speed
+
+    def isOutside(self, coords: list[float], time: float, padding: float = 0) -> bool:
+        return time > self.enclosedTime(coords, padding)
+
+    def cellTime(self, x: int, y: int) -> float:
+        """
+        Time after which the center of cell [x, y] is enclosed, cells off the map are always enclosed.
+        """
+        if x < 0 or x >= self.cellWidth or y < 0 or y >= self.cellHeight:
+            return -1
+        return self.times[x * self.cellHeight + y]
+
+    def cellSafe(self, x: int, y: int, time: float) -> bool:
+        return time <= self.cellTime(x, y)
+
+    def enclosedRings(self, time: float) -> tuple[int, int, int, int]:
+        """
+        Number of columns of cell centers enclosed from the left and the right, and of rows from the top and the bottom.
+        A cell is unsafe as soon as it is enclosed from any side, so together these decide `cellSafe` for every cell.
+        """
+        rings = []
+        for size, cells in [
+            (self.width, self.cellWidth),
+            (self.height, self.cellHeight),
+        ]:
+            centers = [i * CELL_SIZE + CELL_SIZE / 2 for i in range(cells)]
+            # same comparison as cellSafe, the far edge need not be a whole number of cells away
+            near = 0
+            while near < cells and time > centers[near] / self.speed:
+                near += 1
+            far = 0
+            while far < cells and time > (size - centers[-1 - far]) / self.speed:
+                far += 1
+            rings += [near, far]
+        return tuple(rings)
@@ -1,4 +1,4 @@
-from math import cos, sin, sqrt, floor, ceil
+from math import cos, sin, sqrt, floor, ceil, copysign
 from map import *
 
 
@@ -11,7 +11,14 @@ class BulletData:
         self.bounces_left = 2
 
 
-def linecast(start, velocity, walls: Map, destructables: Map) -> tuple[list[int], bool]:
+def linecast(
+    start, velocity, walls: Map, coverage: Map | HeatMap, maxSteps: int = -1
+) -> tuple[list[int], bool] | None:
+    """
+    Steps through the cells along the ray until it hits a wall or leaves the map, marking every visited cell in coverage.
+    Returns the cell hit and whether the ray should be reflected horizontally (x velocity flipped),
+    or None if maxSteps cells were visited first.
+    """
     # |direction[0]| > |direction[1]|
     x = start[0] / CELL_SIZE
     y = start[1] / CELL_SIZE
@@ -30,6 +37,9 @@ def linecast(start, velocity, walls: Map, destructables: Map) -> tuple[list[int]
         end = False
         cx = floor(x)
         while not end:
+            if maxSteps == 0:
+                return None
+            maxSteps -= 1
             cx += dx
             cy = floor(y)
 
@@ -40,7 +50,7 @@ def linecast(start, velocity, walls: Map, destructables: Map) -> tuple[list[int]
 
             newy = y + grad * dx
 
-            destructables.set(cx, cy, True)
+            coverage.mark(cx, cy)
             if walls.get(cx, cy):
                 return [cx, cy], True
 
@@ -65,6 +75,9 @@ def linecast(start, velocity, walls: Map, destructables: Map) -> tuple[list[int]
         end = False
         cy = floor(y)
         while not end:
+            if maxSteps == 0:
+                return None
+            maxSteps -= 1
             cy += dy
             cx = floor(x)
 
@@ -75,7 +88,7 @@ def linecast(start, velocity, walls: Map, destructables: Map) -> tuple[list[int]
 
             newx = x + grad * dy
 
-            destructables.set(cx, cy, True)
+            coverage.mark(cx, cy)
             if walls.get(cx, cy):
                 return [cx, cy], False
 
@@ -88,12 +101,90 @@ def linecast(start, velocity, walls: Map, destructables: Map) -> tuple[list[int]
             x = newx
 
 
-m = Map(50, 50)
-out = Map(50, 50)
-m.set(24, 10, True)
-print(m)
-print(linecast([24 * 20, 24 * 20], [0, -1], m, out))
-print(out)
+def reflect(start, velocity, cell: list[int], hori: bool):
+    """
+    Finds where the ray from start meets the edge of the hit cell and returns it with the reflected velocity.
+    """
+    axis = 0 if hori else 1
+    speed = velocity[axis]
+    if speed == 0:
+        return None
+
+    edge = cell[axis] * CELL_SIZE if speed > 0 else (cell[axis] + 1) * CELL_SIZE
+    t = max((edge - start[axis]) / speed, 0)
+    hit = [start[0] + velocity[0] * t, start[1] + velocity[1] * t]
+    # stay on the near side of the edge
+    hit[axis] -= copysign(0.01, speed)
+
+    newVelocity = list(velocity)
+    newVelocity[axis] = -speed
+    return hit, newVelocity
+
+
+def cellSteps(start, velocity, distance: float) -> int:
+    """
+    Number of cells linecast steps into along the major axis while the ray travels `distance` pixels.
+    """
+    axis = 0 if abs(velocity[0]) > abs(velocity[1]) else 1
+    speed = sqrt(velocity[0] * velocity[0] + velocity[1] * velocity[1])
+    begin = start[axis] / CELL_SIZE
+    end = begin + distance * velocity[axis] / speed / CELL_SIZE
+    if velocity[axis] > 0:
+        return floor(end) - floor(begin)
+    return floor(begin) - floor(end)
+
+
+def rasterize(
+    rays, walls: Map, coverage: Map | HeatMap, bounces: int = 0, length: float = -1
+) -> Map | HeatMap:
+    """
+    Stamps every ray (start, velocity) into coverage, following up to `bounces` reflections off walls and map edges.
+    Rays are cut off after travelling `length` pixels when it is positive.
+    With a HeatMap, cells crossed by several rays (or several times by one ray) get a higher count.
+    """
+    for start, velocity in rays:
+        if velocity[0] == 0 and velocity[1] == 0:
+            continue
+
+        cx, cy = worldToCell(start[0], start[1])
+        coverage.mark(cx, cy)
+
+        remaining = length
+        for i in range(bounces + 1):
+            maxSteps = -1 if remaining < 0 else cellSteps(start, velocity, remaining)
+            result = linecast(start, velocity, walls, coverage, maxSteps)
+            if result == None:
+                break
+
+            reflected = reflect(start, velocity, result[0], result[1])
+            if reflected == None:
+                break
+            newStart, velocity = reflected
+
+            if remaining >= 0:
+                dx = newStart[0] - start[0]
+                dy = newStart[1] - start[1]
+                remaining -= sqrt(dx * dx + dy * dy)
+                if remaining <= 0:
+                    break
+            start = newStart
+
+    return coverage
+
+
+if __name__ == "__main__":
+    m = Map(50, 50)
+    out = Map(50, 50)
+    m.set(24, 10, True)
+    print(m)
+    print(linecast([24 * 20, 24 * 20], [0, -1], m, out))
+    print(out)
+
+    heat = HeatMap(50, 50)
+    rasterize(
+        [([24 * 20, 24 * 20], [0, -1]), ([10 * 20, 24 * 20], [1, -1])], m, heat, 2
+    )
+    print(heat)
 
 
 class Path:
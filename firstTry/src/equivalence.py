@@ -0,0 +1,301 @@
+"""
+Randomised differential checks of the fast geometry paths against the code they replace.
+Usage: python equivalence.py [seed] [maps]
+
+Every check runs the reference and the optimised version on the same random maps and rays, and reports mismatches
+(with a few examples). Checks with a slower reference also report the time each side took, the two sides take turns
+going first. Exits with 1 if anything mismatched.
+Block skipping is forced on in these checks so it gets exercised on every map, the density benchmark printed after
+them shows what it costs or saves on maps of different density and which setting Game picks for each.
+"""
+
+import contextlib
+import os
+import random
+import sys
+import time
+
+from game import Game, DELTA_TIME, BOUNDARY_SPEED, addVect, distanceSqr
+from map import Map, HeatMap, CELL_SIZE, BLOCK_SIZE, worldToCell, occupiedBlocks
+from boundary import BoundarySchedule
+import bulletTrack
+
+RAYS_PER_MAP = 300
+EXAMPLES = 3
+
+
+def timed(call) -> tuple[float, object]:
+    begin = time.perf_counter()
+    result = call()
+    return time.perf_counter() - begin, result
+
+
+class Check:
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.mismatches = 0
+        self.examples = []
+        self.referenceTime = 0.0
+        self.fastTime = 0.0
+
+    def compare(self, reference, fast, args):
+        """
+        Runs both callables and records whether their results agree.
+        """
+        if self.count % 2 == 0:
+            referenceTime, expected = timed(reference)
+            fastTime, actual = timed(fast)
+        else:
+            fastTime, actual = timed(fast)
+            referenceTime, expected = timed(reference)
+        self.referenceTime += referenceTime
+        self.fastTime += fastTime
+        self.record(expected == actual, (args, expected, actual))
+
+    def record(self, ok: bool, example):
+        self.count += 1
+        if not ok:
+            self.mismatches += 1
+            if len(self.examples) < EXAMPLES:
+                self.examples.append(example)
+
+    def report(self) -> str:
+        line = f"{self.name:<22} {self.count:>7} {self.mismatches:>10}"
+        if self.fastTime > 0:
+            line += f" {self.referenceTime:>9.3f}s {self.fastTime:>9.3f}s {self.referenceTime / self.fastTime:>7.2f}x"
+        for example in self.examples:
+            line += f"\n    {example}"
+        return line
+
+
+def makeGame(rng: random.Random, clusters: float = -1, fence: bool = True) -> Game:
+    """
+    A Game with a random layout of wall and destructable clusters, without talking to the game server.
+    `clusters` is the number of clusters per cell, random up to 1/40 by default.
+    The map is fenced in by walls as linecast relies on hitting something to stop when a ray never reaches its end.
+    """
+    width = rng.randint(20, 60)
+    height = rng.randint(20, 60)
+    if clusters < 0:
+        clusters = rng.randint(0, width * height // 40) / (width * height)
+
+    game = object.__new__(Game)
+    game.gameTime = rng.uniform(0, 10)
+    game.coarseRaycast = True
+    game.width = width * CELL_SIZE
+    game.height = height * CELL_SIZE
+    game.boundary = BoundarySchedule(game.width, game.height, BOUNDARY_SPEED)
+    game.walls = Map(width, height)
+    game.destructables = Map(width, height)
+
+    if fence:
+        for x in range(width):
+            game.walls.set(x, 0, True)
+            game.walls.set(x, height - 1, True)
+        for y in range(height):
+            game.walls.set(0, y, True)
+            game.walls.set(width - 1, y, True)
+
+    for i in range(round(clusters * width * height)):
+        grid = game.walls if rng.random() < 0.5 else game.destructables
+        x0 = rng.randrange(width)
+        y0 = rng.randrange(height)
+        for x in range(x0, x0 + rng.randint(1, 6)):
+            for y in range(y0, y0 + rng.randint(1, 3)):
+                grid.set(x, y, True)
+    return game
+
+
+def randomPoint(rng: random.Random, game: Game) -> list[float]:
+    """
+    A point inside the fence and the current boundary.
+    """
+    while True:
+        point = [rng.uniform(0, game.width), rng.uniform(0, game.height)]
+        if not game.outsideBounds(point, CELL_SIZE + 5):
+            return point
+
+
+def crossesCell(start, end) -> bool:
+    """
+    Game.linecast only stops at walls or the end cell along its major axis, skip rays that never leave their cell.
+    """
+    axis = 0 if abs(end[0] - start[0]) > abs(end[1] - start[1]) else 1
+    return start[axis] // CELL_SIZE != end[axis] // CELL_SIZE
+
+
+def spansBlock(start, end) -> bool:
+    """
+    Whether linecast may skip blocks along the ray, it has to cover more than a block along its major axis.
+    """
+    axis = 0 if abs(end[0] - start[0]) > abs(end[1] - start[1]) else 1
+    return abs(end[axis] // CELL_SIZE - start[axis] // CELL_SIZE) > BLOCK_SIZE
+
+
+def referenceOutsideBounds(game: Game, coords, padding):
+    # outsideBounds before the boundary schedule
+    lower, upper = game.getBoundary(game.gameTime)
+    for i in [0, 1]:
+        if coords[i] - padding - lower[i] < 0 or upper[i] - padding - coords[i] < 0:
+            return True
+    return False
+
+
+def checkLinecast(check: Check, game: Game, start, end):
+    def cast(coarse):
+        game.coarseRaycast = coarse
+        return game.linecast(start, end)
+
+    check.compare(lambda: cast(False), lambda: cast(True), (start, end))
+    game.coarseRaycast = True
+
+
+def checkPredict(check: Check, game: Game, start, velocity, duration: float):
+    def predict(coarse):
+        game.coarseRaycast = coarse
+        return game.predictBullet(start, velocity, duration)
+
+    check.compare(
+        lambda: predict(False), lambda: predict(True), (start, velocity, duration)
+    )
+    game.coarseRaycast = True
+
+
+def checkBounds(check: Check, game: Game, point, padding: float):
+    check.compare(
+        lambda: referenceOutsideBounds(game, point, padding),
+        lambda: game.outsideBounds(point, padding),
+        (point, padding, game.gameTime),
+    )
+
+
+def checkLinecastBounds(check: Check, game: Game, start, end):
+    # wherever linecastBounds hits, the schedule has to agree the boundary (5px in) is there right now
+    result = game.linecastBounds(start, end)
+    if result != None:
+        enclosed = game.boundary.enclosedTime(result[0], 5)
+        check.record(abs(enclosed - game.gameTime) < 1e-6, (start, end, result))
+
+
+def checkRasterize(check: Check, game: Game, start, velocity):
+    # a single ray without bounces has to cover exactly what bulletTrack.linecast visits, nothing to time as it is the
+    # same walk either way
+    def covered(grid) -> set[tuple[int, int]]:
+        return {
+            (x, y)
+            for x in range(grid.width)
+            for y in range(grid.height)
+            if grid.get(x, y)
+        }
+
+    def single():
+        coverage = HeatMap(game.walls.width, game.walls.height)
+        coverage.mark(*worldToCell(start[0], start[1]))
+        bulletTrack.linecast(start, velocity, game.walls, coverage)
+        return coverage
+
+    def multi():
+        coverage = HeatMap(game.walls.width, game.walls.height)
+        return bulletTrack.rasterize([(start, velocity)], game.walls, coverage)
+
+    check.record(covered(single()) == covered(multi()), (start, velocity))
+
+
+def run(seed: int, maps: int) -> list[Check]:
+    rng = random.Random(seed)
+    linecast = Check("Game.linecast")
+    predict = Check("Game.predictBullet")
+    bounds = Check("outsideBounds")
+    linecastBounds = Check("linecastBounds")
+    rasterize = Check("bulletTrack.rasterize")
+
+    for i in range(maps):
+        game = makeGame(rng)
+        for j in range(RAYS_PER_MAP):
+            start = randomPoint(rng, game)
+            end = randomPoint(rng, game)
+            if crossesCell(start, end):
+                checkLinecast(linecast, game, start, end)
+            point = [rng.uniform(-50, game.width + 50), end[1]]
+            checkBounds(bounds, game, point, rng.choice([0, 5, 60]))
+
+            velocity = [rng.uniform(-400, 400), rng.uniform(-400, 400)]
+            checkLinecastBounds(linecastBounds, game, start, addVect(start, velocity))
+            # predictBullet only skips blocks once the ray, cut off at the boundary, spans more than one of them, a
+            # single tick is never that long
+            duration = rng.uniform(DELTA_TIME, 8)
+            predictEnd = addVect(
+                start, [velocity[0] * duration, velocity[1] * duration]
+            )
+            hit = game.linecastBounds(start, predictEnd)
+            if hit != None:
+                predictEnd = hit[0]
+            if spansBlock(start, predictEnd):
+                checkPredict(predict, game, start, velocity, duration)
+            if velocity[0] != 0 and velocity[1] != 0:
+                checkRasterize(rasterize, game, start, velocity)
+
+    return [linecast, predict, bounds, linecastBounds, rasterize]
+
+
+def densityBenchmark(seed: int, maps: int, fence: bool):
+    """
+    Times Game.linecast per cell, with block skipping forced on, and with the setting Game picks for the map, on maps of
+    increasing wall density. Only rays that cross at least half the map are used as those are the ones skipping is for.
+    `occupied` is the fraction of inner blocks Game bases its setting on.
+    """
+    rng = random.Random(seed)
+    print(
+        f"{'clusters/cell':<14} {'occupied':>8} {'per cell':>10} {'skipping':>10} {'default':>10} {'enabled':>8} {'speedup':>8}"
+    )
+    for clusters in [0, 1 / 800, 1 / 400, 1 / 200, 1 / 100, 1 / 60, 1 / 40, 1 / 20]:
+        occupied = 0.0
+        enabled = 0
+        times = [0.0, 0.0, 0.0]
+        for i in range(maps):
+            game = makeGame(rng, clusters, fence)
+            occupied += (
+                occupiedBlocks(game.walls, game.destructables, border=False) / maps
+            )
+            default = game.coarseSkipWorthwhile()
+            enabled += default
+            rays = []
+            while len(rays) < RAYS_PER_MAP:
+                start = randomPoint(rng, game)
+                end = randomPoint(rng, game)
+                if distanceSqr(start, end) > (game.width * game.width) / 4:
+                    rays.append((start, end))
+            for index, coarse in enumerate([False, True, default]):
+                game.coarseRaycast = coarse
+                begin = time.perf_counter()
+                for start, end in rays:
+                    game.linecast(start, end)
+                times[index] += time.perf_counter() - begin
+        print(
+            f"{clusters:<14.4f} {occupied:>8.2f} {times[0]:>9.3f}s {times[1]:>9.3f}s {times[2]:>9.3f}s {enabled:>4}/{maps:<3} {times[0] / times[2]:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    maps = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    # linecast logs every hit
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+        checks = run(seed, maps)
+
+    print(f"seed {seed}, {maps} maps")
+    print(
+        f"{'check':<22} {'cases':>7} {'mismatches':>10} {'reference':>10} {'fast':>10} {'speedup':>8}"
+    )
+    for check in checks:
+        print(check.report())
+
+    for fence in [False, True]:
+        print(
+            f"\nGame.linecast block skipping by map density, across whole-map rays, {'fenced' if fence else 'open'} maps"
+        )
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stderr(devnull):
+            densityBenchmark(seed, max(maps // 5, 1), fence)
+    sys.exit(1 if any(check.mismatches for check in checks) else 0)
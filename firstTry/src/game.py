@@ -5,10 +5,17 @@ from object_types import ObjectTypes
 
 import sys
 from math import sin, cos, atan, radians, degrees, floor, ceil, sqrt
-from map import Map, worldToCell, cellToWorld, CELL_SIZE
+from map import Map, worldToCell, cellToWorld, occupiedBlocks, CELL_SIZE, BLOCK_SIZE
+from boundary import BoundarySchedule
+from pathing import DistanceField, claimPickups
+from planner import Plan
 
 DELTA_TIME = 0.25
 BOUNDARY_SPEED = 10
+# block skipping only pays off on maps with fewer occupied inner blocks than this, see equivalence.py
+COARSE_MAX_OCCUPIED = 0.35
+# predicted bullets closer than this are dodged
+DANGER_RADIUS = 140
 
 
 def log(text):
@@ -64,6 +71,7 @@ class Game:
         self.oldPos = [0, 0]
         self.circlingDir = 1
         self.lastLOS = False
+        self.plan: Plan | None = None
 
         # begin reading
 
@@ -117,6 +125,7 @@ class Game:
 
         self.width = biggest_x
         self.height = biggest_y
+        self.boundary = BoundarySchedule(biggest_x, biggest_y, BOUNDARY_SPEED)
 
         # create wall map
         x, y = worldToCell(biggest_x, biggest_y)
@@ -135,6 +144,9 @@ class Game:
             # elif game_object["type"] == ObjectTypes.CLOSING_BOUNDARY.value:
             #     self.cb_id =
 
+        # skip empty blocks of the map while raycasting, unless there are too few of them to pay off
+        self.coarseRaycast = self.coarseSkipWorthwhile()
+
         # log(f"Walls:\n{self.walls}")
         # log(f"Breaks:\n{self.destructables}")
 
@@ -146,14 +158,7 @@ class Game:
         ]
 
     def outsideBounds(self, coords: list[float], padding: float = 0) -> bool:
-        lower, upper = self.getBoundary(self.gameTime)
-        for l in addVect(addVect(coords, [-padding, -padding]), scaleVect(-1, lower)):
-            if l < 0:
-                return True
-        for u in addVect(addVect(upper, [-padding, -padding]), scaleVect(-1, coords)):
-            if u < 0:
-                return True
-        return False
+        return self.boundary.isOutside(coords, self.gameTime, padding)
 
     def checkForWalls(self, cell: list[int]) -> int:
         if self.walls.get(cell[0], cell[1]):
@@ -193,6 +198,43 @@ class Game:
         else:
             return None
 
+    def coarseSkipWorthwhile(self) -> bool:
+        # rays mostly cross the inside of the map, a wall around the edge shouldn't rule skipping out
+        occupied = occupiedBlocks(self.walls, self.destructables, border=False)
+        return occupied < COARSE_MAX_OCCUPIED
+
+    def emptyRun(
+        self, major: int, minor: float, step: int, grad: float, endIndex, xMajor: bool
+    ) -> int:
+        """
+        Number of cells a linecast at cell `major` can step over before leaving the current block column (or row),
+        0 if the run could touch a wall or destructable.
+        """
+        start = major + step
+        block = start // BLOCK_SIZE
+        if step > 0:
+            count = (block + 1) * BLOCK_SIZE - start
+        else:
+            count = start - block * BLOCK_SIZE + 1
+        # stop just short of the end cell so it still gets reached
+        if 0 <= (endIndex - start) * step < count:
+            count = int((endIndex - start) * step)
+            if count == 0:
+                return 0
+        last = major + step * (count - 1)
+
+        # every cell checked lies within one of the minor axis cells crossed
+        minorEnd = minor + grad * step * count
+        low = floor(min(minor, minorEnd) - 0.01) - 1
+        high = floor(max(minor, minorEnd) + 0.01) + 1
+        if xMajor:
+            region = (min(start, last), low, max(start, last), high)
+        else:
+            region = (low, min(start, last), high, max(start, last))
+        if self.walls.regionEmpty(*region) and self.destructables.regionEmpty(*region):
+            return count
+        return 0
+
     def linecast(self, start, end) -> tuple[list[float], bool, bool] | None:
         x = start[0] / CELL_SIZE
         y = start[1] / CELL_SIZE
@@ -217,7 +259,18 @@ class Game:
             endIndex = end[0] // CELL_SIZE
 
             cell: list[int] = [floor(x), 0]
+            # rays shorter than a block can't skip anything
+            coarse = self.coarseRaycast and abs(endIndex - floor(x)) > BLOCK_SIZE
+            tryCoarse = coarse
             while True:
+                # jump over empty blocks, y is stepped the same way as below so the result matches cell by cell
+                while tryCoarse:
+                    run = self.emptyRun(cell[0], y, dx, grad, endIndex, True)
+                    for i in range(run):
+                        cell[0] += dx
+                        y += grad * dx
+                    tryCoarse = run != 0
+
                 cell[0] += dx
                 cell[1] = floor(y)
 
@@ -244,6 +297,10 @@ class Game:
                         return coords, hori, type == 2
 
                 y = newy
+                # only look at the coarse layer again once the next cell is in a new block
+                tryCoarse = (
+                    coarse and (cell[0] + dx) // BLOCK_SIZE != cell[0] // BLOCK_SIZE
+                )
         else:
             grad = velocity[0] / velocity[1]
 
@@ -258,7 +315,16 @@ class Game:
             endIndex = end[1] // CELL_SIZE
 
             cy = floor(y)
+            coarse = self.coarseRaycast and abs(endIndex - floor(y)) > BLOCK_SIZE
+            tryCoarse = coarse
             while True:
+                while tryCoarse:
+                    run = self.emptyRun(cy, x, dy, grad, endIndex, False)
+                    for i in range(run):
+                        cy += dy
+                        x += grad * dy
+                    tryCoarse = run != 0
+
                 cy += dy
                 cx = floor(x)
                 newx = x + grad * dy
@@ -284,6 +350,7 @@ class Game:
                         return coords, hori, type == 2
 
                 x = newx
+                tryCoarse = coarse and (cy + dy) // BLOCK_SIZE != cy // BLOCK_SIZE
 
     def predictBullet(
         self, start, velocity, duration
@@ -317,6 +384,43 @@ class Game:
         else:
             return end, velocity
 
+    def planFingerprint(self, selfPos, enemyPos, candidates) -> tuple:
+        # the BFS avoids cells the boundary has enclosed, the rings decide which those are
+        rings = self.boundary.enclosedRings(self.gameTime)
+        return (
+            worldToCell(selfPos[0], selfPos[1]),
+            worldToCell(enemyPos[0], enemyPos[1]),
+            frozenset(candidates),
+            self.walls.version,
+            self.destructables.version,
+            rings,
+        )
+
+    def makePlan(self, selfPos, enemyPos, candidates, fingerprint) -> Plan:
+        # compare travel distances around walls, both fields are only needed when there is something to pick up
+        bestPickup = None
+        if candidates:
+            ours = DistanceField(
+                worldToCell(selfPos[0], selfPos[1]),
+                self.walls,
+                self.destructables,
+                self.boundary,
+                self.gameTime,
+            )
+            theirs = DistanceField(
+                worldToCell(enemyPos[0], enemyPos[1]),
+                self.walls,
+                self.destructables,
+                self.boundary,
+                self.gameTime,
+            )
+            claimed = claimPickups(candidates, ours, theirs)
+            if claimed:
+                log(f"[{self.gameTime}] Good powerup found!")
+                bestPickup = self.objects[min(claimed, key=claimed.get)]["position"]
+
+        return Plan(fingerprint, bestPickup)
+
     def read_next_turn_data(self):
         """
         It's our turn! Read what the game has sent us and update the game info.
@@ -399,18 +503,22 @@ class Game:
         action = {}
 
         removal = []
-        bestPickup = None
-        bestDist = self.width * self.width
+        candidates: dict[str, tuple[int, int]] = {}
         for pickup in self.pickups:
             pos = self.objects[pickup]["position"]
             if self.outsideBounds(pos, 60):
                 removal.append(pickup)
             else:
-                selfDist = distanceSqr(pos, selfPos)
-                if selfDist < bestDist and selfDist < distanceSqr(pos, enemyPos):
-                    log(f"[{self.gameTime}] Good powerup found!")
-                    bestPickup = pos
-                    bestDist = selfDist
+                candidates[pickup] = worldToCell(pos[0], pos[1])
+
+        # the pickup search only depends on cells, pickups and the boundary, redo it when one of them changed
+        fingerprint = self.planFingerprint(selfPos, enemyPos, candidates)
+        if self.plan != None and self.plan.matches(fingerprint):
+            self.plan.turns += 1
+            log(f"[{self.gameTime}] Reusing plan from {self.plan.turns} turns")
+        else:
+            self.plan = self.makePlan(selfPos, enemyPos, candidates, fingerprint)
+        bestPickup = self.plan.bestPickup
         # remove out of bounds
         for a in removal:
             self.pickups.remove(a)
@@ -522,7 +630,7 @@ class Game:
             delta = addVect(newPos, scaleVect(-1, selfPos))
             delta[0] += 0.01
             sqrDist = delta[0] * delta[0] + delta[1] * delta[1]
-            if sqrDist < 140 * 140:
+            if sqrDist < DANGER_RADIUS * DANGER_RADIUS:
                 velSqr = newVel[0] * newVel[0] + newVel[1] * newVel[1] + 0.001
                 dDotV = delta[0] * newVel[0] + delta[1] * newVel[1]
                 dangerVect = addVect(
@@ -564,7 +672,7 @@ class Game:
 
         safePos = [self.width / 2 + 100, self.height / 2]
         # endgame
-        if bounds[1][1] - bounds[0][1] < 150:
+        if self.gameTime > self.boundary.endgameTime:
             log(f"[{self.gameTime}] End game")
             if distanceSqr(safePos, selfPos) < 30 * 30:
                 movement = {"move": -1}
@@ -1,4 +1,6 @@
 CELL_SIZE = 20
+# cells per side of a block in the coarse occupancy layer
+BLOCK_SIZE = 8
 
 
 def worldToCell(x, y) -> tuple[int, int]:
@@ -19,12 +21,51 @@ class Map:
         self.cells: list[list[int]] = []
         self.width = cellWidth
         self.height = cellHeight
+        # bumped on every change
+        self.version = 0
         for i in range(cellWidth):
             count = (cellHeight - 1) // 32 + 1
             column: list[int] = []
             for j in range(count):
                 column.append(0)
             self.cells.append(column)
+        # nothing is set yet, no need to count
+        self.blocks: list[list[int]] = [
+            [0] * ((cellHeight - 1) // BLOCK_SIZE + 1)
+            for i in range((cellWidth - 1) // BLOCK_SIZE + 1)
+        ]
+
+    def rebuildBlocks(self):
+        """
+        Recounts the coarse layer, `blocks[bx][by]` is the number of set cells in that BLOCK_SIZE x BLOCK_SIZE block.
+        """
+        blocksHigh = (self.height - 1) // BLOCK_SIZE + 1
+        self.blocks: list[list[int]] = [
+            [0] * blocksHigh for i in range((self.width - 1) // BLOCK_SIZE + 1)
+        ]
+        # BLOCK_SIZE divides 32, so each block's rows are a run of bits within one column word
+        perWord = 32 // BLOCK_SIZE
+        mask = (1 << BLOCK_SIZE) - 1
+        for x in range(self.width):
+            column = self.blocks[x // BLOCK_SIZE]
+            for i, bitmap in enumerate(self.cells[x]):
+                by = i * perWord
+                while bitmap and by < blocksHigh:
+                    column[by] += (bitmap & mask).bit_count()
+                    bitmap >>= BLOCK_SIZE
+                    by += 1
+
+    @staticmethod
+    def fromWords(cellWidth: int, cellHeight: int, words) -> "Map":
+        """
+        Wraps a flat sequence of 32 bit column bitmaps (e.g. a memoryview) without copying it.
+        """
+        result = Map(0, cellHeight)
+        result.width = cellWidth
+        count = (cellHeight - 1) // 32 + 1
+        result.cells = [words[i * count : (i + 1) * count] for i in range(cellWidth)]
+        result.rebuildBlocks()
+        return result
 
     def __str__(self):
         output = ""
@@ -39,7 +80,7 @@ class Map:
         return output
 
     def set(self, x: int, y: int, toSet: bool):
-        if x < 0 or x >= self.width or y < 0 or y >= self.width:
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
             return False
 
         count = y // 32
@@ -47,13 +88,21 @@ class Map:
         bitmap = self.cells[x][count]
 
         mask = 1 << bitIndex
+        if (mask & bitmap != 0) == toSet:
+            return
+        self.version += 1
         if toSet:
             self.cells[x][count] |= mask
+            self.blocks[x // BLOCK_SIZE][y // BLOCK_SIZE] += 1
         else:
             self.cells[x][count] &= ~mask
+            self.blocks[x // BLOCK_SIZE][y // BLOCK_SIZE] -= 1
+
+    def mark(self, x: int, y: int):
+        self.set(x, y, True)
 
     def get(self, x: int, y: int) -> bool:
-        if x < 0 or x >= self.width or y < 0 or y >= self.width:
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
             return False
 
         count = y // 32
@@ -63,6 +112,68 @@ class Map:
         mask = 1 << bitIndex
         return mask & bitmap != 0
 
+    def regionEmpty(self, x0: int, y0: int, x1: int, y1: int) -> bool:
+        """
+        Checks the coarse layer for any set cell in the inclusive cell range, cells off the map count as empty.
+        """
+        x0 = max(x0, 0) // BLOCK_SIZE
+        y0 = max(y0, 0) // BLOCK_SIZE
+        x1 = min(x1, self.width - 1) // BLOCK_SIZE
+        y1 = min(y1, self.height - 1) // BLOCK_SIZE
+        for bx in range(x0, x1 + 1):
+            column = self.blocks[bx]
+            for by in range(y0, y1 + 1):
+                if column[by] != 0:
+                    return False
+        return True
+
+
+def occupiedBlocks(*grids: Map, border: bool = True) -> float:
+    """
+    Fraction of coarse blocks that have a set cell in any of the given maps (all the same size).
+    With `border` False the outer ring of blocks is left out (so a wall around the edge of the map doesn't count),
+    unless the map is too small to have any other blocks.
+    """
+    blocks = grids[0].blocks
+    xs = range(len(blocks))
+    ys = range(len(blocks[0]))
+    if not border and len(xs) > 2 and len(ys) > 2:
+        xs = xs[1:-1]
+        ys = ys[1:-1]
+    occupied = 0
+    for bx in xs:
+        for by in ys:
+            if any(grid.blocks[bx][by] != 0 for grid in grids):
+                occupied += 1
+    return occupied / (len(xs) * len(ys))
+
+
+class HeatMap:
+    """
+    Counts how many times each cell has been marked, same interface as Map but not limited to a single bit.
+    """
+
+    def __init__(self, cellWidth: int, cellHeight: int):
+        self.width = cellWidth
+        self.height = cellHeight
+        self.cells: list[list[int]] = [[0] * cellHeight for i in range(cellWidth)]
+
+    def __str__(self):
+        output = ""
+        for column in self.cells:
+            output += "".join(str(min(count, 9)) for count in reversed(column)) + "\n"
+        return output
+
+    def mark(self, x: int, y: int):
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return
+        self.cells[x][y] += 1
+
+    def get(self, x: int, y: int) -> int:
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return 0
+        return self.cells[x][y]
+
 
 # map = Map(50, 50)
 # map.set(1, 1, True)
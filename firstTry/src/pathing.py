@@ -0,0 +1,75 @@
+from array import array
+from collections import deque
+
+from map import Map
+from boundary import BoundarySchedule
+
+UNREACHABLE = -1
+
+
+class DistanceField:
+    """
+    Travel distance (in cells) from a start cell to every other cell on the map, found with a BFS over the grid.
+    Walls, destructables and cells already enclosed by the boundary are impassable.
+    Distances are stored column major (same as Map) in `distances`.
+    """
+
+    def __init__(
+        self,
+        start: tuple[int, int],
+        walls: Map,
+        destructables: Map,
+        boundary: BoundarySchedule,
+        time: float,
+    ):
+        self.width = walls.width
+        self.height = walls.height
+        self.distances = array("i", [UNREACHABLE]) * (self.width * self.height)
+
+        if not self.inMap(start[0], start[1]):
+            return
+
+        self.distances[start[0] * self.height + start[1]] = 0
+        queue = deque([start])
+        while queue:
+            x, y = queue.popleft()
+            dist = self.distances[x * self.height + y] + 1
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if not self.inMap(nx, ny):
+                    continue
+                index = nx * self.height + ny
+                if self.distances[index] != UNREACHABLE:
+                    continue
+                if (
+                    walls.get(nx, ny)
+                    or destructables.get(nx, ny)
+                    or not boundary.cellSafe(nx, ny, time)
+                ):
+                    continue
+                self.distances[index] = dist
+                queue.append((nx, ny))
+
+    def inMap(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, x: int, y: int) -> int:
+        if not self.inMap(x, y):
+            return UNREACHABLE
+        return self.distances[x * self.height + y]
+
+
+def claimPickups(
+    pickups: dict[str, tuple[int, int]], ours: DistanceField, theirs: DistanceField
+) -> dict[str, int]:
+    """
+    Returns our travel distance to every pickup we can reach strictly before the enemy.
+    """
+    claimed = {}
+    for pickup, cell in pickups.items():
+        selfDist = ours.get(cell[0], cell[1])
+        if selfDist == UNREACHABLE:
+            continue
+        enemyDist = theirs.get(cell[0], cell[1])
+        if enemyDist == UNREACHABLE or selfDist < enemyDist:
+            claimed[pickup] = selfDist
+    return claimed
@@ -0,0 +1,14 @@
+class Plan:
+    """
+    The parts of a turn's decision that stay valid while the tanks are in the same cells and nothing on the map changed:
+    the pickup we are heading for. Line of sight depends on exact positions so it is not part of a plan.
+    `fingerprint` is everything the plan was computed from, a plan is reused as long as it matches.
+    """
+
+    def __init__(self, fingerprint: tuple, bestPickup):
+        self.fingerprint = fingerprint
+        self.bestPickup = bestPickup
+        self.turns = 1
+
+    def matches(self, fingerprint: tuple) -> bool:
+        return self.fingerprint == fingerprint
@@ -0,0 +1,145 @@
+"""
+Snapshot layout (little endian):
+- header: magic, version, reserved, cell width, cell height, words per column, length of the json blob (16 bytes)
+- walls bitmap: width * words per column uint32
+- destructables bitmap: width * words per column uint32
+- json blob: {"state": {...}, "objects": {...}}
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from map import Map
+
+MAGIC = b"CQSN"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHHHI")
+
+
+def wordsPerColumn(cellHeight: int) -> int:
+    return (cellHeight - 1) // 32 + 1
+
+
+def mapWords(grid: Map) -> array:
+    words = array("I")
+    for column in grid.cells:
+        words.extend(column)
+    if sys.byteorder != "little":
+        words.byteswap()
+    return words
+
+
+def dumpSnapshot(
+    walls: Map,
+    destructables: Map,
+    objects: dict | None = None,
+    state: dict | None = None,
+) -> bytes:
+    blob = json.dumps({"state": state or {}, "objects": objects or {}}).encode()
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        0,
+        walls.width,
+        walls.height,
+        wordsPerColumn(walls.height),
+        len(blob),
+    )
+    return header + mapWords(walls).tobytes() + mapWords(destructables).tobytes() + blob
+
+
+def saveSnapshot(
+    path: str,
+    walls: Map,
+    destructables: Map,
+    objects: dict | None = None,
+    state: dict | None = None,
+):
+    with open(path, "wb") as file:
+        file.write(dumpSnapshot(walls, destructables, objects, state))
+
+
+def saveGame(game, path: str):
+    state = {
+        "tank_id": game.tank_id,
+        "enemy_id": game.enemy_id,
+        "width": game.width,
+        "height": game.height,
+        "gameTime": game.gameTime,
+        "turnCount": game.turnCount,
+        "pickups": sorted(game.pickups),
+        "bullets": sorted(game.bullets),
+    }
+    saveSnapshot(path, game.walls, game.destructables, game.objects, state)
+
+
+class Snapshot:
+    """
+    A loaded snapshot. The walls and destructables maps point straight into the given buffer, writing to them never
+    touches the file when loaded with `load`. The json blob is only parsed when `objects` or `state` is first used.
+    """
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        magic, version, _, width, height, count, blobLength = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a snapshot or unsupported snapshot version")
+
+        mapBytes = width * count * 4
+        offset = HEADER.size
+        self.buffer = buffer
+        self.walls = Map.fromWords(
+            width, height, self.words(view[offset : offset + mapBytes])
+        )
+        offset += mapBytes
+        self.destructables = Map.fromWords(
+            width, height, self.words(view[offset : offset + mapBytes])
+        )
+        offset += mapBytes
+        self.blob = view[offset : offset + blobLength]
+        self.data = None
+
+    @staticmethod
+    def load(path: str) -> "Snapshot":
+        with open(path, "rb") as file:
+            return Snapshot(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY))
+
+    @staticmethod
+    def words(view: memoryview):
+        if sys.byteorder == "little":
+            return view.cast("I")
+        # big endian hosts pay for a copy
+        words = array("I", view.tobytes())
+        words.byteswap()
+        return words
+
+    def decode(self) -> dict:
+        if self.data is None:
+            self.data = json.loads(bytes(self.blob))
+        return self.data
+
+    @property
+    def objects(self) -> dict:
+        return self.decode()["objects"]
+
+    @property
+    def state(self) -> dict:
+        return self.decode()["state"]
+
+
+def diffMaps(old: Map, new: Map) -> list[tuple[int, int]]:
+    """
+    Returns every cell that differs between two maps of the same size.
+    """
+    changed = []
+    for x in range(old.width):
+        for i, (a, b) in enumerate(zip(old.cells[x], new.cells[x])):
+            delta = a ^ b
+            while delta:
+                bit = delta & -delta
+                changed.append((x, i * 32 + bit.bit_length() - 1))
+                delta ^= bit
+    return changed